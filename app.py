@@ -2,8 +2,11 @@
 from __future__ import annotations
 
 import argparse
+import errno
 import os
+import select
 import signal
+import struct
 import sys
 import time
 from pathlib import Path
@@ -43,6 +46,103 @@ def _write_pid(pidfile: str, pid: int) -> None:
     p.write_text(f"{pid}\n", encoding="utf-8")
 
 
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _inotify_watch_dir(path: str) -> Optional[int]:
+    """Return an inotify fd watching `path` for new files, or None if unsupported."""
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), _IN_CREATE | _IN_MOVED_TO | _IN_CLOSE_WRITE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _inotify_names(fd: int) -> list[bytes]:
+    try:
+        data = os.read(fd, 4096)
+    except BlockingIOError:
+        return []
+    names: list[bytes] = []
+    off = 0
+    while off + _INOTIFY_EVENT.size <= len(data):
+        _wd, _mask, _cookie, ln = _INOTIFY_EVENT.unpack_from(data, off)
+        off += _INOTIFY_EVENT.size
+        names.append(data[off : off + ln].rstrip(b"\0"))
+        off += ln
+    return names
+
+
+def _wait_for_pidfile(pidfile: str, watch_fd: Optional[int], *, timeout_s: float) -> Optional[int]:
+    name = os.fsencode(os.path.basename(pidfile))
+    deadline = time.monotonic() + timeout_s
+    while True:
+        pid = _read_pid(pidfile)
+        if pid:
+            return pid
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if watch_fd is None:
+            time.sleep(min(1.0, remaining))
+            continue
+        ready, _, _ = select.select([watch_fd], [], [], remaining)
+        if ready and name in _inotify_names(watch_fd):
+            # gunicorn writes via tmp+rename; give a partial write a moment to settle.
+            for _ in range(10):
+                pid = _read_pid(pidfile)
+                if pid:
+                    return pid
+                time.sleep(0.01)
+
+
+def _wait_for_exit_pidfd(pid: int, *, timeout_s: float) -> Optional[bool]:
+    """Wait on a pidfd (Linux >= 5.3). Returns None if pidfds are unavailable."""
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except OSError as e:
+        if e.errno in (errno.ENOSYS, errno.EINVAL, errno.EPERM):
+            return None
+        raise
+
+    try:
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        return bool(poller.poll(int(timeout_s * 1000)))
+    finally:
+        os.close(fd)
+
+
+def _wait_for_exit(pid: int, *, timeout_s: float) -> bool:
+    done = _wait_for_exit_pidfd(pid, timeout_s=timeout_s)
+    if done is not None:
+        return done
+
+    # Fallback for kernels/platforms without pidfd support.
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout_s:
+        if not _pid_is_running(pid):
+            return True
+        time.sleep(0.2)
+    return False
+
+
 def _stop(pidfile: str, *, timeout_s: float = 10.0) -> int:
     pid = _read_pid(pidfile)
     if not pid:
@@ -64,19 +164,16 @@ def _stop(pidfile: str, *, timeout_s: float = 10.0) -> int:
         print(f"Permission error stopping pid {pid}: {e}", file=sys.stderr)
         return 1
 
-    t0 = time.monotonic()
-    while time.monotonic() - t0 < timeout_s:
-        if not _pid_is_running(pid):
-            try:
-                Path(pidfile).unlink(missing_ok=True)
-            except Exception:
-                pass
-            print("Stopped.")
-            return 0
-        time.sleep(0.2)
+    if not _wait_for_exit(pid, timeout_s=timeout_s):
+        print("Timed out waiting for process to stop.", file=sys.stderr)
+        return 1
 
-    print("Timed out waiting for process to stop.", file=sys.stderr)
-    return 1
+    try:
+        Path(pidfile).unlink(missing_ok=True)
+    except Exception:
+        pass
+    print("Stopped.")
+    return 0
 
 
 def _daemonize(host: str, port: int, pidfile: str, access_log: str, error_log: str, workers: int, threads: int) -> int:
@@ -84,6 +181,12 @@ def _daemonize(host: str, port: int, pidfile: str, access_log: str, error_log: s
     if existing and _pid_is_running(existing):
         print(f"PrinterPal already running (pid {existing}).", file=sys.stderr)
         return 1
+    if existing:
+        # Stale pidfile; remove it so we don't mistake it for the new daemon's.
+        try:
+            Path(pidfile).unlink(missing_ok=True)
+        except Exception:
+            pass
 
     argv = [
         sys.executable,
@@ -107,13 +210,22 @@ def _daemonize(host: str, port: int, pidfile: str, access_log: str, error_log: s
         "app:app",
     ]
 
+    pid_dir = os.path.dirname(os.path.abspath(pidfile))
+    os.makedirs(pid_dir, exist_ok=True)
+    watch_fd = _inotify_watch_dir(pid_dir)
     try:
-        run_cmd(argv, timeout_s=20.0, check=True)
-    except PrinterPalError as e:
-        print(f"Failed to start gunicorn daemon: {e}", file=sys.stderr)
-        return 1
+        try:
+            run_cmd(argv, timeout_s=5.0, check=True)
+        except PrinterPalError as e:
+            print(f"Failed to start gunicorn daemon: {e}", file=sys.stderr)
+            return 1
+
+        # With --daemon, gunicorn returns before the master has written its pidfile.
+        pid = _wait_for_pidfile(pidfile, watch_fd, timeout_s=5.0 if watch_fd is None else 20.0)
+    finally:
+        if watch_fd is not None:
+            os.close(watch_fd)
 
-    pid = _read_pid(pidfile)
     if not pid:
         print("Gunicorn started, but pidfile was not created.", file=sys.stderr)
         return 1
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import os
 import secrets
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any, Dict
 
@@ -12,35 +11,45 @@ from .util import PrinterPalError, atomic_write_json, read_json
 DEFAULT_CONFIG_PATH = os.environ.get("PRINTERPAL_CONFIG", "/etc/printerpal/config.json")
 
 
-def _default_config() -> Dict[str, Any]:
-    return {
-        "app": {
-            "host": "0.0.0.0",
-            "port": 80,
-            "secret_key": secrets.token_hex(32),
-            "max_upload_mb": 25,
-        },
-        "printing": {
-            "default_printer": "",
-            "preview_dpi": 150,
-            "print_dpi": 200,
-            "max_pdf_pages_process": 30,
-            "default_copies": 1,
-            "default_mode": "grayscale",  # raw|grayscale|bw|dither|outline
-            "bw_threshold": 180,
-        },
-        "airprint": {
-            "auto_enable": True,
-        },
-        "ui": {
-            "default_dark_mode": False,
-            "default_eink_mode": False,
-        },
-        "security": {
-            "require_token": False,
-            "token": "",
-        },
-    }
+_DEFAULTS_STATIC: Dict[str, Any] = {
+    "app": {
+        "host": "0.0.0.0",
+        "port": 80,
+        "secret_key": "",
+        "max_upload_mb": 25,
+    },
+    "printing": {
+        "default_printer": "",
+        "preview_dpi": 150,
+        "print_dpi": 200,
+        "max_pdf_pages_process": 30,
+        "default_copies": 1,
+        "default_mode": "grayscale",  # raw|grayscale|bw|dither|outline
+        "bw_threshold": 180,
+    },
+    "airprint": {
+        "auto_enable": True,
+    },
+    "ui": {
+        "default_dark_mode": False,
+        "default_eink_mode": False,
+    },
+    "security": {
+        "require_token": False,
+        "token": "",
+    },
+}
+
+
+def _merged(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Return base updated with override. Only dicts are copied; leaf values are shared."""
+    out = {k: _merged(v, {}) if isinstance(v, dict) else v for k, v in base.items()}
+    for k, v in override.items():
+        if isinstance(out.get(k), dict) and isinstance(v, dict):
+            out[k] = _merged(out[k], v)
+        else:
+            out[k] = v
+    return out
 
 
 def _as_int(v: Any, *, min_v: int, max_v: int, name: str) -> int:
@@ -54,17 +63,12 @@ def _as_int(v: Any, *, min_v: int, max_v: int, name: str) -> int:
 
 def validate_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
     """Validate and normalize config. Raises PrinterPalError on invalid data."""
-    base = _default_config()
-    merged = deepcopy(base)
-
-    def merge(dst: Dict[str, Any], src: Dict[str, Any]) -> None:
-        for k, v in src.items():
-            if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
-                merge(dst[k], v)
-            else:
-                dst[k] = v
-
-    merge(merged, cfg)
+    # One merge copies the defaults' dicts; cfg's values are laid over them.
+    merged = _merged(_DEFAULTS_STATIC, cfg)
+    app_cfg = cfg.get("app")
+    if not isinstance(app_cfg, dict) or "secret_key" not in app_cfg:
+        # Only pay for a fresh secret when the caller doesn't already have one.
+        merged["app"]["secret_key"] = secrets.token_hex(32)
 
     # app
     merged["app"]["port"] = _as_int(merged["app"].get("port"), min_v=1, max_v=65535, name="app.port")
@@ -119,15 +123,15 @@ class ConfigStore:
 
     def load(self) -> Dict[str, Any]:
         if not os.path.exists(self.path):
-            cfg = validate_config({})
-            self.save(cfg)
-            return cfg
+            return self.save({})
 
         data = read_json(self.path)
         if not isinstance(data, dict):
             raise PrinterPalError("Config file must be a JSON object")
         return validate_config(data)
 
-    def save(self, cfg: Dict[str, Any]) -> None:
+    def save(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and persist cfg; returns the normalized config that was written."""
         cfg2 = validate_config(cfg)
         atomic_write_json(self.path, cfg2)
+        return cfg2
@@ -1,35 +1,80 @@
 from __future__ import annotations
 
-import hashlib
 import io
 import os
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, Tuple
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
 
 from PIL import Image, ImageFilter, ImageOps
 
+from . import rendercache
 from .util import PrinterPalError, run_cmd
 
+try:
+    import pypdfium2 as pdfium  # type: ignore
+except Exception:
+    # Optional: fall back to poppler's pdftoppm.
+    pdfium = None
+
 
 SUPPORTED_IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
 
+_PRINT_MODES = frozenset({"raw", "grayscale", "bw", "dither", "outline"})
+# Modes whose output depends on printing.bw_threshold.
+_THRESHOLD_MODES = frozenset({"bw", "outline"})
+
+# PDFium is not thread-safe, not even across separate documents, so every call is serialized.
+_PDFIUM_LOCK = threading.Lock()
+_pdfium_docs: Dict[Any, Any] = {}
+
+
+# (abspath, size, mtime_ns): cheap to build and hash, and changes whenever the file does.
+FileSig = Tuple[str, int, int]
+
+
+def _file_sig(path: str, st: os.stat_result | None = None) -> FileSig:
+    if st is None:
+        st = os.stat(path)
+    return (os.path.abspath(path), int(st.st_size), int(st.st_mtime_ns))
+
+
+def pdf_page_count(path: str, *, sig: FileSig | None = None) -> int:
+    if sig is None:
+        try:
+            sig = _file_sig(path)
+        except FileNotFoundError:
+            raise PrinterPalError("PDF not found") from None
+    # sig already carries the absolute path; pass it as the path so relative and
+    # absolute spellings of one file share a cache entry.
+    return _pdf_page_count_cached(sig, sig[0])
 
-def _sha256_bytes(data: bytes) -> str:
-    h = hashlib.sha256()
-    h.update(data)
-    return h.hexdigest()
 
+@lru_cache(maxsize=128)
+def _pdf_page_count_cached(sig: FileSig, path: str) -> int:
+    # Keyed by sig, so an edited file (new size/mtime) is counted afresh.
+    if pdfium is not None:
+        with _PDFIUM_LOCK:
+            try:
+                return len(_pdfium_document(path, sig))
+            except pdfium.PdfiumError:
+                pass
+
+    try:
+        import pikepdf  # type: ignore
+
+        with pikepdf.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        pass
 
-def _file_sig(path: str) -> str:
-    st = os.stat(path)
-    token = f"{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}".encode("utf-8")
-    return _sha256_bytes(token)
+    return _pdfinfo_page_count(path)
 
 
-def pdf_page_count(path: str) -> int:
-    if not os.path.exists(path):
-        raise PrinterPalError("PDF not found")
+def _pdfinfo_page_count(path: str) -> int:
     res = run_cmd(["pdfinfo", path], timeout_s=8.0, check=True)
     for ln in (res.stdout or "").splitlines():
         if ln.lower().startswith("pages:"):
@@ -40,9 +85,79 @@ def pdf_page_count(path: str) -> int:
     raise PrinterPalError("Unable to determine PDF page count (pdfinfo output unexpected)")
 
 
-def _render_pdf_page_to_png(path: str, *, page: int, dpi: int) -> Image.Image:
+def _render_pdf_page_to_png(path: str, *, page: int, dpi: int, sig: FileSig | None = None) -> Image.Image:
     if page < 1:
         raise PrinterPalError("page must be >= 1")
+    if sig is None:
+        sig = _file_sig(path)
+    return rendercache.get_or_render(
+        sig, page=page, dpi=dpi, render=lambda: _rasterize_pdf_page(path, page=page, dpi=dpi, sig=sig)
+    )
+
+
+def _render_pdf_page_mode(
+    path: str, *, page: int, dpi: int, mode: str, threshold: int, sig: FileSig | None = None
+) -> Image.Image:
+    mode = (mode or "").lower()
+    # Reject unknown modes before the name reaches a cache filename.
+    if mode not in _PRINT_MODES:
+        raise PrinterPalError("Unsupported mode")
+    if sig is None:
+        sig = _file_sig(path)
+    if mode == "raw":
+        return _render_pdf_page_to_png(path, page=page, dpi=dpi, sig=sig)
+
+    if page < 1:
+        raise PrinterPalError("page must be >= 1")
+
+    def render() -> Image.Image:
+        # Only the mode variant is read back, so don't also cache the full-colour raster.
+        im = _rasterize_pdf_page(path, page=page, dpi=dpi, sig=sig)
+        return apply_mode(im, mode, threshold=threshold)
+
+    # grayscale/dither ignore the threshold; keying on it would only cause needless misses.
+    variant = f"{mode}-t{threshold}" if mode in _THRESHOLD_MODES else mode
+    return rendercache.get_or_render(sig, page=page, dpi=dpi, render=render, variant=variant)
+
+
+def _rasterize_pdf_page(path: str, *, page: int, dpi: int, sig: FileSig) -> Image.Image:
+    if pdfium is not None:
+        return _pdfium_page(path, page=page, dpi=dpi, sig=sig)
+    return _pdftoppm_page(path, page=page, dpi=dpi)
+
+
+def _pdfium_document(path: str, sig: FileSig) -> Any:
+    # Keep the most recently used document open so multi-page jobs parse the xref once.
+    doc = _pdfium_docs.get(sig)
+    if doc is None:
+        for old in _pdfium_docs.values():
+            old.close()
+        _pdfium_docs.clear()
+        doc = pdfium.PdfDocument(path)
+        _pdfium_docs[sig] = doc
+    return doc
+
+
+def _pdfium_page(path: str, *, page: int, dpi: int, sig: FileSig) -> Image.Image:
+    with _PDFIUM_LOCK:
+        try:
+            doc = _pdfium_document(path, sig)
+            if page > len(doc):
+                raise PrinterPalError(f"page {page} out of range (document has {len(doc)} pages)")
+            pdf_page = doc[page - 1]
+            try:
+                bitmap = pdf_page.render(scale=dpi / 72.0)
+                try:
+                    return bitmap.to_pil().convert("RGB")
+                finally:
+                    bitmap.close()
+            finally:
+                pdf_page.close()
+        except pdfium.PdfiumError as e:
+            raise PrinterPalError(f"Unable to render PDF page: {e}") from e
+
+
+def _pdftoppm_page(path: str, *, page: int, dpi: int) -> Image.Image:
     with tempfile.TemporaryDirectory(prefix="printerpal_pdf_") as td:
         outprefix = os.path.join(td, "page")
         # pdftoppm uses 1-based page numbers
@@ -78,32 +193,37 @@ def _open_image(path: str) -> Image.Image:
         raise PrinterPalError(f"Unable to open image: {e}") from e
 
 
+@lru_cache(maxsize=16)
+def _threshold_lut(threshold: int) -> Tuple[int, ...]:
+    t = max(0, min(256, int(threshold)))
+    return (0,) * t + (255,) * (256 - t)
+
+
 def apply_mode(im: Image.Image, mode: str, *, threshold: int) -> Image.Image:
+    """Apply a print mode. Returns the narrowest PIL mode that represents the result
+    ("L" for grayscale, "1" for bw/dither/outline); callers widen only if they must."""
     mode = (mode or "").lower()
 
     if mode == "raw":
         return im
 
     if mode == "grayscale":
-        return im.convert("L").convert("RGB")
+        return im.convert("L")
 
     if mode == "bw":
         g = im.convert("L")
-        bw = g.point(lambda p: 255 if p >= threshold else 0, mode="L")
-        return bw.convert("RGB")
+        return g.point(_threshold_lut(threshold), "1")
 
     if mode == "dither":
         g = im.convert("L")
-        bw1 = g.convert("1")
-        return bw1.convert("RGB")
+        return g.convert("1")
 
     if mode == "outline":
         g = im.convert("L")
         edges = g.filter(ImageFilter.FIND_EDGES)
         edges = ImageOps.autocontrast(edges)
         inv = ImageOps.invert(edges)
-        bw = inv.point(lambda p: 255 if p >= threshold else 0, mode="L")
-        return bw.convert("RGB")
+        return inv.point(_threshold_lut(threshold), "1")
 
     raise PrinterPalError("Unsupported mode")
 
@@ -116,79 +236,104 @@ def render_preview_png(
     width: int,
     preview_dpi: int,
     threshold: int,
+    st: os.stat_result | None = None,
 ) -> bytes:
+    """Render a PNG preview; pass `st` if the caller has already stat()ed `path`."""
     if width < 64 or width > 2000:
         raise PrinterPalError("width must be between 64 and 2000")
 
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
-        im = _render_pdf_page_to_png(path, page=page, dpi=preview_dpi)
+        im2 = _render_pdf_page_mode(
+            path, page=page, dpi=preview_dpi, mode=mode, threshold=threshold, sig=_file_sig(path, st)
+        )
     elif ext in SUPPORTED_IMAGE_EXTS:
-        im = _open_image(path)
+        im2 = apply_mode(_open_image(path), mode, threshold=threshold)
     else:
         raise PrinterPalError("Preview supports PDF and common image formats")
 
-    im2 = apply_mode(im, mode, threshold=threshold)
-
     # Resize to requested width, preserve aspect ratio.
     w0, h0 = im2.size
     if w0 <= 0 or h0 <= 0:
         raise PrinterPalError("Invalid image dimensions")
-    scale = min(1.0, float(width) / float(w0))
-    new_w = max(1, int(w0 * scale))
-    new_h = max(1, int(h0 * scale))
-    im2 = im2.resize((new_w, new_h), resample=Image.Resampling.LANCZOS)
-
+    if w0 > width:
+        # LANCZOS buys nothing on thresholded/grayscale pages; BILINEAR is much cheaper.
+        # thumbnail() also box-reduces first on large downscales before resampling.
+        narrow = im2.mode in ("1", "L")
+        if im2.mode == "1":
+            # Pillow only resizes 1-bit images with NEAREST; downscale in 8-bit instead.
+            im2 = im2.convert("L")
+        resample = Image.Resampling.BILINEAR if narrow else Image.Resampling.LANCZOS
+        im2.thumbnail((width, h0), resample=resample)
+
+    # Keep the narrow mode from apply_mode: 1-bit/8-bit PNGs are far smaller and faster
+    # to encode than RGB, and level 1 is plenty for a screen preview.
     buf = io.BytesIO()
-    im2.save(buf, format="PNG", optimize=True)
+    im2.save(buf, format="PNG", compress_level=1)
     return buf.getvalue()
 
 
-def _images_to_pdf_bytes(images: list[Image.Image]) -> bytes:
+def _pdf_ready(im: Image.Image) -> Image.Image:
+    # Monochrome and grayscale embed natively; anything else goes through RGB.
+    return im if im.mode in ("1", "L", "RGB") else im.convert("RGB")
+
+
+def _write_images_pdf(images: list[Image.Image], out: BinaryIO) -> None:
     # Prefer img2pdf (more predictable PDF output) and fall back to Pillow.
+    start = out.tell()
     try:
         import img2pdf  # type: ignore
 
         img_blobs: list[bytes] = []
         for im in images:
             bio = io.BytesIO()
-            im.convert("RGB").save(bio, format="PNG", optimize=True)
+            # img2pdf copies non-interlaced PNG IDAT straight into the PDF (1-bit pages
+            # included), so the only encode is ours; skip optimize=True's repeated DEFLATE passes.
+            _pdf_ready(im).save(bio, format="PNG")
             img_blobs.append(bio.getvalue())
 
-        return img2pdf.convert(img_blobs)
+        img2pdf.convert(img_blobs, outputstream=out)
     except Exception:
-        # Pillow fallback
-        buf = io.BytesIO()
-        rgb_images = [im.convert("RGB") for im in images]
-        first, rest = rgb_images[0], rgb_images[1:]
-        first.save(buf, format="PDF", save_all=True, append_images=rest)
-        return buf.getvalue()
+        # Pillow fallback; discard anything img2pdf may have written first.
+        out.seek(start)
+        out.truncate()
+        pdf_images = [_pdf_ready(im) for im in images]
+        first, rest = pdf_images[0], pdf_images[1:]
+        first.save(out, format="PDF", save_all=True, append_images=rest)
 
 
-def prepare_print_file(
+def _render_for_print(
     src_path: str,
     *,
     mode: str,
     print_dpi: int,
     max_pdf_pages: int,
     threshold: int,
-) -> Tuple[str, Dict[str, Any]]:
-    """Prepare a PDF for printing and return (path, metadata).
+    st: os.stat_result | None = None,
+) -> Tuple[Optional[Callable[[BinaryIO], None]], Dict[str, Any]]:
+    """Render src_path for printing; returns (writer, metadata).
 
-    The returned path is a temporary file that the caller must delete.
+    writer emits the prepared PDF into a binary stream, and is None in raw mode.
     """
-    if not os.path.exists(src_path):
-        raise PrinterPalError("Source file not found")
+    if st is None:
+        try:
+            st = os.stat(src_path)
+        except FileNotFoundError:
+            raise PrinterPalError("Source file not found") from None
 
     ext = os.path.splitext(src_path)[1].lower()
     meta: Dict[str, Any] = {"source": src_path, "mode": mode, "print_dpi": print_dpi}
 
     if mode == "raw":
         # Print original, no conversion.
-        return src_path, {**meta, "prepared": False}
+        return None, {**meta, "prepared": False}
 
     if ext == ".pdf":
-        pages = pdf_page_count(src_path)
+        # One signature serves the page-count memo and the render cache, so reprinting an
+        # unchanged file at the same print_dpi/mode neither re-counts nor re-rasterizes it.
+        # Previews render at preview_dpi and are cached separately; they do not feed printing.
+        sig = _file_sig(src_path, st)
+        pages = pdf_page_count(src_path, sig=sig)
         meta["pages"] = pages
         if pages > max_pdf_pages:
             raise PrinterPalError(
@@ -196,32 +341,78 @@ def prepare_print_file(
                 "Either increase printing.max_pdf_pages_process or use 'Raw' mode."
             )
 
-        imgs: list[Image.Image] = []
-        for p in range(1, pages + 1):
-            im = _render_pdf_page_to_png(src_path, page=p, dpi=print_dpi)
-            im2 = apply_mode(im, mode, threshold=threshold)
-            imgs.append(im2)
+        def render_page(p: int) -> Image.Image:
+            return _render_pdf_page_mode(src_path, page=p, dpi=print_dpi, mode=mode, threshold=threshold, sig=sig)
 
-        pdf_bytes = _images_to_pdf_bytes(imgs)
+        # Pages are independent; pdftoppm and PIL both release the GIL, so threads overlap well.
+        # Worker count also bounds how many full-resolution pages are in flight at once.
+        workers = max(1, min(pages, os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="printerpal-render") as ex:
+            imgs = list(ex.map(render_page, range(1, pages + 1)))
 
-        fd, outpath = tempfile.mkstemp(prefix="printerpal_print_", suffix=".pdf")
-        os.close(fd)
-        with open(outpath, "wb") as f:
-            f.write(pdf_bytes)
-        return outpath, {**meta, "prepared": True, "output": outpath}
+        return (lambda out: _write_images_pdf(imgs, out)), {**meta, "prepared": True}
 
     if ext in SUPPORTED_IMAGE_EXTS:
         im = _open_image(src_path)
-        im2 = apply_mode(im, mode, threshold=threshold)
+        im2 = _pdf_ready(apply_mode(im, mode, threshold=threshold))
 
         # Convert to single-page PDF for consistent printing across drivers.
-        buf = io.BytesIO()
-        im2.convert("RGB").save(buf, format="PDF")
-
-        fd, outpath = tempfile.mkstemp(prefix="printerpal_print_", suffix=".pdf")
-        os.close(fd)
-        with open(outpath, "wb") as f:
-            f.write(buf.getvalue())
-        return outpath, {**meta, "prepared": True, "output": outpath}
+        return (lambda out: im2.save(out, format="PDF")), {**meta, "prepared": True}
 
     raise PrinterPalError("Unsupported file type for printing")
+
+
+def prepare_print_bytes(
+    src_path: str,
+    *,
+    mode: str,
+    print_dpi: int,
+    max_pdf_pages: int,
+    threshold: int,
+    st: os.stat_result | None = None,
+) -> Tuple[Optional[bytes], Dict[str, Any]]:
+    """Prepare a PDF for printing in memory and return (pdf_bytes, metadata).
+
+    pdf_bytes is None in raw mode, where the source file should be printed as-is.
+    """
+    write, meta = _render_for_print(
+        src_path, mode=mode, print_dpi=print_dpi, max_pdf_pages=max_pdf_pages, threshold=threshold, st=st
+    )
+    if write is None:
+        return None, meta
+
+    buf = io.BytesIO()
+    write(buf)
+    return buf.getvalue(), meta
+
+
+def prepare_print_file(
+    src_path: str,
+    *,
+    mode: str,
+    print_dpi: int,
+    max_pdf_pages: int,
+    threshold: int,
+) -> Tuple[str, Dict[str, Any]]:
+    """Prepare a PDF for printing and return (path, metadata).
+
+    The returned path is a temporary file that the caller must delete.
+    """
+    write, meta = _render_for_print(
+        src_path, mode=mode, print_dpi=print_dpi, max_pdf_pages=max_pdf_pages, threshold=threshold
+    )
+    if write is None:
+        return src_path, meta
+
+    # Stream the PDF straight into the mkstemp fd rather than building it in memory and reopening.
+    fd, outpath = tempfile.mkstemp(prefix="printerpal_print_", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+    except BaseException:
+        try:
+            os.remove(outpath)
+        except OSError:
+            pass
+        raise
+    return outpath, {**meta, "output": outpath}
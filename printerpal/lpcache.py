@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Sequence, Tuple
+
+from .util import CmdResult, run_cmd
+
+
+_lock = threading.Lock()
+_entries: Dict[Tuple[str, ...], Tuple[float, CmdResult]] = {}
+_inflight: Dict[Tuple[str, ...], threading.Event] = {}
+
+
+def cached_run(argv: Sequence[str], *, ttl: float = 1.0, timeout_s: float = 8.0) -> CmdResult:
+    """Run a read-only command, reusing a result younger than `ttl` seconds.
+
+    Concurrent callers asking for the same argv wait for the in-flight run instead of
+    spawning their own. Commands always run with check=False; errors raised by
+    run_cmd (missing binary, timeout) are not cached.
+    """
+    key = tuple(argv)
+    while True:
+        with _lock:
+            hit = _entries.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+            ev = _inflight.get(key)
+            leader = ev is None
+            if leader:
+                ev = threading.Event()
+                _inflight[key] = ev
+
+        if not leader:
+            ev.wait(timeout_s)
+            continue
+
+        try:
+            res = run_cmd(key, timeout_s=timeout_s, check=False)
+            with _lock:
+                _entries[key] = (time.monotonic() + ttl, res)
+            return res
+        finally:
+            with _lock:
+                _inflight.pop(key, None)
+            ev.set()
+
+
+def invalidate() -> None:
+    """Drop all cached results (call after anything that changes CUPS state)."""
+    with _lock:
+        _entries.clear()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import dataclasses
 import os
 import re
 import shlex
@@ -7,12 +8,19 @@ import tempfile
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
+from . import lpcache
 from .util import CmdResult, CommandError, PrinterPalError, run_cmd
 
 
-_LPSTAT_PRINTER_RE = re.compile(r"^printer\s+(?P<name>\S+)\s+(?P<state>idle|disabled|busy)\s+.*", re.I)
-_CUPS_PRINTER_INFO_RE = re.compile(r"^Info\s+(?P<info>.+)$")
-_CUPS_PRINTER_START_RE = re.compile(r"^<(?:Printer|DefaultPrinter)\s+(?P<name>[^>]+)>")
+_LPSTAT_PRINTER_RE = re.compile(
+    r"^[ \t]*printer[ \t]+(?P<name>\S+)[ \t]+(?P<state>idle|disabled|busy)[ \t]+.*$", re.I | re.M
+)
+_LPSTAT_ACCEPTING_RE = re.compile(r"^(?P<name>\S+)(?:.*?(?P<neg>not[ \t]+accepting))?", re.M)
+_JOB_ID_RE = re.compile(r"[A-Za-z0-9_.\-]+")
+_CUPS_PRINTER_BLOCK_RE = re.compile(
+    r"<(?P<tag>Printer|DefaultPrinter)\s+(?P<name>[^>]+)>(?P<body>.*?)</(?P=tag)>", re.S
+)
+_CUPS_PRINTER_INFO_RE = re.compile(r"^[ \t]*Info[ \t]+(?P<info>.+?)[ \t]*$", re.M)
 
 _CUPS_PRINTER_CONF_PATHS = (
     "/etc/cups/printers.conf",
@@ -34,52 +42,67 @@ def _safe_timeout() -> float:
     return 6.0
 
 
+def _cached_run(argv: List[str], *, ttl: float = 1.0) -> CmdResult:
+    # Status queries are read-only and a single page load issues several of them.
+    return lpcache.cached_run(argv, ttl=ttl, timeout_s=_safe_timeout())
+
+
 def cups_available() -> bool:
     try:
-        run_cmd(["lpstat", "-r"], timeout_s=_safe_timeout(), check=False)
+        _cached_run(["lpstat", "-r"])
         return True
     except PrinterPalError:
         return False
 
 
+def _parse_default(text: str) -> str:
+    # Example: "system default destination: HP_LaserJet"
+    m = re.search(r"destination:\s*(\S+)", text)
+    return m.group(1) if m else ""
+
+
 def get_default_printer() -> str:
     try:
-        res = run_cmd(["lpstat", "-d"], timeout_s=_safe_timeout(), check=False)
-        # Example: "system default destination: HP_LaserJet"
-        m = re.search(r"destination:\s*(\S+)", res.stdout)
-        return m.group(1) if m else ""
+        res = _cached_run(["lpstat", "-d"])
+        return _parse_default(res.stdout)
     except PrinterPalError:
         return ""
 
 
+def _parse_cups_printer_info(text: str) -> Dict[str, str]:
+    info_map: Dict[str, str] = {}
+    for block in _CUPS_PRINTER_BLOCK_RE.finditer(text):
+        info = _CUPS_PRINTER_INFO_RE.search(block.group("body"))
+        if info:
+            label = info.group("info").strip().strip('"')
+            if label:
+                info_map[block.group("name").strip()] = label
+    return info_map
+
+
+# path -> ((mtime_ns, size), info_map); printers.conf rarely changes between requests.
+_cups_info_cache: Dict[str, Any] = {}
+
+
 def _load_cups_printer_info() -> Dict[str, str]:
     info_map: Dict[str, str] = {}
     for path in _CUPS_PRINTER_CONF_PATHS:
         try:
-            with open(path, "r", encoding="utf-8", errors="replace") as handle:
-                current: Optional[str] = None
-                for raw_line in handle:
-                    line = raw_line.strip()
-                    if not line:
-                        continue
-                    start = _CUPS_PRINTER_START_RE.match(line)
-                    if start:
-                        current = start.group("name").strip()
-                        continue
-                    if line.startswith("</Printer>") or line.startswith("</DefaultPrinter>"):
-                        current = None
-                        continue
-                    if current:
-                        info = _CUPS_PRINTER_INFO_RE.match(line)
-                        if info:
-                            label = info.group("info").strip().strip('"')
-                            if label:
-                                info_map[current] = label
+            st = os.stat(path)
+            key = (st.st_mtime_ns, st.st_size)
+            cached = _cups_info_cache.get(path)
+            if cached is not None and cached[0] == key:
+                info_map = cached[1]
+            else:
+                with open(path, "rb") as handle:
+                    text = handle.read().decode("utf-8", "replace")
+                info_map = _parse_cups_printer_info(text)
+                _cups_info_cache[path] = (key, info_map)
         except OSError:
             continue
         if info_map:
             break
-    return info_map
+    return dict(info_map)
 
 
 def get_default_printer_display() -> str:
@@ -90,19 +113,9 @@ def get_default_printer_display() -> str:
     return info_map.get(default, default)
 
 
-def list_printers() -> List[PrinterInfo]:
-    default = get_default_printer()
-    info_map = _load_cups_printer_info()
+def _parse_printers(text: str, *, default: str, info_map: Dict[str, str]) -> List[PrinterInfo]:
     printers: List[PrinterInfo] = []
-
-    res = run_cmd(["lpstat", "-p"], timeout_s=_safe_timeout(), check=False)
-    for line in (res.stdout or "").splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        m = _LPSTAT_PRINTER_RE.match(line)
-        if not m:
-            continue
+    for m in _LPSTAT_PRINTER_RE.finditer(text):
         name = m.group("name")
         state = m.group("state").lower()
         accepting = None
@@ -115,36 +128,35 @@ def list_printers() -> List[PrinterInfo]:
                 display_name=info_map.get(name),
             )
         )
+    return printers
 
-    # Attempt to fill accepting info.
-    acc = run_cmd(["lpstat", "-a"], timeout_s=_safe_timeout(), check=False)
-    for line in (acc.stdout or "").splitlines():
-        parts = line.strip().split()
-        if not parts:
+
+def _apply_accepting(printers: List[PrinterInfo], text: str) -> List[PrinterInfo]:
+    by_name = {p.name: p for p in printers}
+    for m in _LPSTAT_ACCEPTING_RE.finditer(text):
+        p = by_name.get(m.group("name"))
+        if p is None:
             continue
-        name = parts[0]
-        accepting = True
-        if "not" in parts and "accepting" in parts:
-            accepting = False
-        for p in printers:
-            if p.name == name:
-                printers[printers.index(p)] = PrinterInfo(
-                    name=p.name,
-                    state=p.state,
-                    is_default=p.is_default,
-                    accepting=accepting,
-                    display_name=p.display_name,
-                )
-                break
+        by_name[p.name] = dataclasses.replace(p, accepting=m.group("neg") is None)
+    return list(by_name.values())
 
-    return printers
 
+def list_printers() -> List[PrinterInfo]:
+    default = get_default_printer()
+    info_map = _load_cups_printer_info()
 
-def queue_jobs() -> List[Dict[str, Any]]:
-    res = run_cmd(["lpstat", "-o"], timeout_s=_safe_timeout(), check=False)
+    res = _cached_run(["lpstat", "-p"])
+    printers = _parse_printers(res.stdout or "", default=default, info_map=info_map)
+
+    # Attempt to fill accepting info.
+    acc = _cached_run(["lpstat", "-a"])
+    return _apply_accepting(printers, acc.stdout or "")
+
+
+def _parse_jobs(text: str) -> List[Dict[str, Any]]:
     jobs: List[Dict[str, Any]] = []
     # Example: "HP_LaserJet-12  user  1024  Mon 01 Jan 2026 10:00:00 AM"
-    for line in (res.stdout or "").splitlines():
+    for line in text.splitlines():
         line = line.strip()
         if not line:
             continue
@@ -158,15 +170,21 @@ def queue_jobs() -> List[Dict[str, Any]]:
     return jobs
 
 
-def job_stats() -> Dict[str, Any]:
+def queue_jobs() -> List[Dict[str, Any]]:
+    res = _cached_run(["lpstat", "-o"])
+    return _parse_jobs(res.stdout or "")
+
+
+def job_stats(active: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     stats: Dict[str, Any] = {}
 
     # Completed jobs count
-    completed = run_cmd(["lpstat", "-W", "completed", "-o"], timeout_s=_safe_timeout(), check=False)
+    completed = _cached_run(["lpstat", "-W", "completed", "-o"])
     completed_lines = [ln for ln in (completed.stdout or "").splitlines() if ln.strip()]
 
     # Active jobs
-    active = queue_jobs()
+    if active is None:
+        active = queue_jobs()
 
     stats["completed_jobs"] = len(completed_lines)
     stats["active_jobs"] = len(active)
@@ -175,15 +193,78 @@ def job_stats() -> Dict[str, Any]:
     return stats
 
 
+def _parse_scheduler(text: str) -> Dict[str, Any]:
+    running = "running" in text.lower()
+    return {"cups_scheduler_running": running, "raw": text.strip()}
+
+
 def scheduler_status() -> Dict[str, Any]:
     try:
-        res = run_cmd(["lpstat", "-r"], timeout_s=_safe_timeout(), check=False)
-        running = "running" in (res.stdout or "").lower()
-        return {"cups_scheduler_running": running, "raw": res.stdout.strip()}
+        res = _cached_run(["lpstat", "-r"])
+        return _parse_scheduler(res.stdout or "")
     except PrinterPalError as e:
         return {"cups_scheduler_running": False, "raw": "", "error": str(e)}
 
 
+@dataclass(frozen=True)
+class PrinterSnapshot:
+    default: str
+    default_display: str
+    info_map: Dict[str, str]
+    printers: List[PrinterInfo]
+    jobs: List[Dict[str, Any]]
+    scheduler: Dict[str, Any]
+
+
+def _split_lpstat_sections(text: str) -> Dict[str, List[str]]:
+    """Bucket combined `lpstat -r -d -p -a -o` output by the option that produced each line."""
+    sections: Dict[str, List[str]] = {"r": [], "d": [], "p": [], "a": [], "o": []}
+    for line in text.splitlines():
+        if not line.strip() or line[0].isspace():
+            # Blank, or an indented detail line under a printer entry.
+            continue
+        low = line.lower()
+        if low.startswith("scheduler is"):
+            sections["r"].append(line)
+        elif "default destination" in low:
+            sections["d"].append(line)
+        elif low.startswith("printer "):
+            sections["p"].append(line)
+        elif "accepting requests" in low:
+            sections["a"].append(line)
+        else:
+            sections["o"].append(line)
+    return sections
+
+
+def snapshot() -> PrinterSnapshot:
+    """Collect default printer, printers, queue and scheduler state from a single lpstat run."""
+    info_map = _load_cups_printer_info()
+    try:
+        res = _cached_run(["lpstat", "-r", "-d", "-p", "-a", "-o"])
+    except PrinterPalError as e:
+        return PrinterSnapshot(
+            default="",
+            default_display="",
+            info_map=info_map,
+            printers=[],
+            jobs=[],
+            scheduler={"cups_scheduler_running": False, "raw": "", "error": str(e)},
+        )
+
+    sections = {k: "\n".join(v) for k, v in _split_lpstat_sections(res.stdout or "").items()}
+    default = _parse_default(sections["d"])
+    printers = _parse_printers(sections["p"], default=default, info_map=info_map)
+    return PrinterSnapshot(
+        default=default,
+        default_display=info_map.get(default, default) if default else "",
+        info_map=info_map,
+        printers=_apply_accepting(printers, sections["a"]),
+        jobs=_parse_jobs(sections["o"]),
+        scheduler=_parse_scheduler(sections["r"]),
+    )
+
+
 def printer_detail(name: str) -> Dict[str, Any]:
     if not name:
         return {}
@@ -193,18 +274,7 @@ def printer_detail(name: str) -> Dict[str, Any]:
     return {"name": name, "detail": txt}
 
 
-def print_file(
-    file_path: str,
-    *,
-    printer: str | None,
-    copies: int,
-    title: str,
-    options: List[str] | None = None,
-    timeout_s: float = 30.0,
-) -> CmdResult:
-    if not os.path.exists(file_path):
-        raise PrinterPalError(f"File does not exist: {file_path}")
-
+def _lp_argv(*, printer: str | None, copies: int, title: str, options: List[str] | None) -> List[str]:
     if copies < 1 or copies > 99:
         raise PrinterPalError("copies must be between 1 and 99")
 
@@ -221,17 +291,59 @@ def print_file(
             continue
         argv += ["-o", opt]
 
-    argv.append(file_path)
+    return argv
+
 
+def _run_lp(argv: List[str], *, timeout_s: float, input: bytes | None = None) -> CmdResult:
     try:
-        return run_cmd(argv, timeout_s=timeout_s, check=True)
+        return run_cmd(argv, timeout_s=timeout_s, check=True, input=input)
     except CommandError as e:
         raise PrinterPalError(
             f"Printing failed: {e.result.stderr.strip() or e.result.stdout.strip() or 'unknown error'}"
         ) from e
+    finally:
+        lpcache.invalidate()
+
+
+def print_file(
+    file_path: str,
+    *,
+    printer: str | None,
+    copies: int,
+    title: str,
+    options: List[str] | None = None,
+    timeout_s: float = 30.0,
+) -> CmdResult:
+    if not os.path.exists(file_path):
+        raise PrinterPalError(f"File does not exist: {file_path}")
+
+    argv = _lp_argv(printer=printer, copies=copies, title=title, options=options)
+    argv.append(file_path)
+    return _run_lp(argv, timeout_s=timeout_s)
+
+
+def print_bytes(
+    data: bytes,
+    *,
+    printer: str | None,
+    copies: int,
+    title: str,
+    options: List[str] | None = None,
+    timeout_s: float = 30.0,
+) -> CmdResult:
+    """Print an in-memory document by piping it to `lp` on stdin."""
+    if not data:
+        raise PrinterPalError("Nothing to print")
+
+    argv = _lp_argv(printer=printer, copies=copies, title=title, options=options)
+    argv.append("-")
+    return _run_lp(argv, timeout_s=timeout_s, input=data)
 
 
 def cancel_job(job_id: str) -> None:
-    if not job_id or not re.match(r"^[A-Za-z0-9_.-]+$", job_id):
+    if not job_id or not _JOB_ID_RE.fullmatch(job_id):
         raise PrinterPalError("Invalid job id")
-    run_cmd(["cancel", job_id], timeout_s=_safe_timeout(), check=True)
+    try:
+        run_cmd(["cancel", job_id], timeout_s=_safe_timeout(), check=True)
+    finally:
+        lpcache.invalidate()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Tuple
+
+from PIL import Image
+
+
+CACHE_DIR = os.environ.get("PRINTERPAL_CACHE_DIR", "/var/lib/printerpal/cache")
+RENDER_CACHE_DIR = os.path.join(CACHE_DIR, "pages")
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("PRINTERPAL_RENDER_CACHE_MB", "256")) * 1024 * 1024
+
+# A full walk re-stat()s every entry, which is slow on SD cards, so only run one when the
+# running estimate (last scan + bytes written since) could exceed the budget, or it is stale.
+# Other gunicorn workers write too, hence the periodic rescan. Trimming to a low-water mark
+# leaves headroom so a full cache doesn't rescan on every subsequent write.
+EVICT_RESCAN_S = 60.0
+EVICT_LOW_WATER = 0.9
+
+_evict_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_approx_total: int | None = None
+_last_scan = 0.0
+
+
+def _sig_token(sig: Tuple[str, int, int]) -> str:
+    # Filesystem-safe, fixed-width name for a (path, size, mtime_ns) file signature.
+    return hashlib.blake2b(repr(sig).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _entry_path(sig: Tuple[str, int, int], page: int, dpi: int, variant: str) -> str:
+    token = _sig_token(sig)
+    name = f"{token}-p{page}-d{dpi}"
+    if variant:
+        name += f"-{variant}"
+    return os.path.join(RENDER_CACHE_DIR, token[:2], f"{name}.png")
+
+
+def _load(path: str) -> Image.Image | None:
+    try:
+        with Image.open(path) as im:
+            im.load()
+            return im.copy()
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write(path: str, write: Callable[[str], None]) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write(tmp)
+        os.replace(tmp, path)
+        size = os.path.getsize(path)
+    except OSError:
+        # The cache is best-effort; an unwritable cache dir must not break rendering.
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    _note_write(size)
+
+
+def _note_write(size: int) -> None:
+    global _approx_total
+    with _stats_lock:
+        if _approx_total is not None:
+            _approx_total += size
+        due = (
+            _approx_total is None
+            or _approx_total > RENDER_CACHE_MAX_BYTES
+            or time.monotonic() - _last_scan > EVICT_RESCAN_S
+        )
+    if due:
+        evict(int(RENDER_CACHE_MAX_BYTES * EVICT_LOW_WATER))
+
+
+def _store(path: str, im: Image.Image) -> None:
+    _atomic_write(path, lambda tmp: im.save(tmp, format="PNG", compress_level=1))
+
+
+def _write_bytes(tmp: str, data: bytes) -> None:
+    with open(tmp, "wb") as f:
+        f.write(data)
+
+
+def _touch(path: str) -> None:
+    try:
+        # Refresh mtime so eviction drops least-recently-used entries first.
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _file_path(key: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, key[:2], f"{key}.png")
+
+
+def lookup_file(key: str) -> str | None:
+    """Return the path of a cached PNG stored under `key`, or None on a miss."""
+    path = _file_path(key)
+    if not os.path.isfile(path):
+        return None
+    _touch(path)
+    return path
+
+
+def store_file(key: str, data: bytes) -> None:
+    """Cache already-encoded PNG bytes under `key` (a filesystem-safe hex string)."""
+    _atomic_write(_file_path(key), lambda tmp: _write_bytes(tmp, data))
+
+
+def evict(max_bytes: int = RENDER_CACHE_MAX_BYTES) -> None:
+    """Trim the render cache to `max_bytes`, oldest entries first."""
+    global _approx_total, _last_scan
+    if not _evict_lock.acquire(blocking=False):
+        return
+    total = 0
+    scanned = False
+    try:
+        entries: list[tuple[float, int, str]] = []
+        try:
+            buckets = list(os.scandir(RENDER_CACHE_DIR))
+        except OSError:
+            return
+        scanned = True
+        for bucket in buckets:
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            try:
+                with os.scandir(bucket.path) as it:
+                    for entry in it:
+                        if not entry.name.endswith(".png") or not entry.is_file(follow_symlinks=False):
+                            continue
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+            except OSError:
+                continue
+
+        if total <= max_bytes:
+            return
+        entries.sort()
+        for _mtime, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+    finally:
+        if scanned:
+            with _stats_lock:
+                _approx_total = total
+                _last_scan = time.monotonic()
+        _evict_lock.release()
+
+
+def get_or_render(
+    sig: Tuple[str, int, int],
+    *,
+    page: int,
+    dpi: int,
+    render: Callable[[], Image.Image],
+    variant: str = "",
+) -> Image.Image:
+    """Return the cached image for (sig, page, dpi, variant), rendering and storing it on a miss."""
+    path = _entry_path(sig, page, dpi, variant)
+    im = _load(path)
+    if im is not None:
+        _touch(path)
+        return im
+    im = render()
+    _store(path, im)
+    return im
@@ -25,8 +25,10 @@
     el.classList.toggle('pp-msg-error', !!isError);
   }
 
-  async function apiGet(url) {
-    const res = await fetch(url, { cache: 'no-store' });
+  // cache: 'no-cache' stores the response but revalidates every time (If-None-Match -> 304);
+  // use it for endpoints that send an ETag.
+  async function apiGet(url, cache = 'no-store') {
+    const res = await fetch(url, { cache });
     if (!res.ok) {
       const txt = await res.text();
       throw new Error(`${res.status} ${res.statusText}: ${txt}`);
@@ -232,7 +234,7 @@
 
   async function refreshAllOnce() {
     const [files, status, cfg] = await Promise.all([
-      apiGet('/api/files'),
+      apiGet('/api/files', 'no-cache'),
       apiGet('/api/status'),
       apiGet('/api/config'),
     ]);
@@ -472,7 +474,7 @@
     const refresh = $('ppRefreshFiles');
     if (refresh) refresh.addEventListener('click', async () => {
       try {
-        const files = await apiGet('/api/files');
+        const files = await apiGet('/api/files', 'no-cache');
         state.lastFiles = files.files || [];
         renderFileList(state.lastFiles);
         showMsg('ppActionMsg', 'Files refreshed.', false);
@@ -8,6 +8,12 @@ import time
 from dataclasses import dataclass
 from typing import Any, Mapping, Sequence
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    # Optional: fall back to the stdlib json module.
+    orjson = None
+
 
 @dataclass(frozen=True)
 class CmdResult:
@@ -45,33 +51,42 @@ def run_cmd(
     timeout_s: float = 8.0,
     check: bool = True,
     env: Mapping[str, str] | None = None,
+    input: bytes | None = None,
 ) -> CmdResult:
-    """Run a command with strict error handling and timeouts."""
+    """Run a command with strict error handling and timeouts.
+
+    `input`, if given, is written to the command's stdin.
+    """
     if not argv:
         raise ValueError("argv must not be empty")
 
+    # subprocess accepts any sequence; only copy when we were not already handed a list.
+    args = argv if isinstance(argv, list) else list(argv)
+
     t0 = time.monotonic()
     try:
+        # No preexec_fn/cwd/user switches, so _posixsubprocess can take its vfork() path.
         cp = subprocess.run(
-            list(argv),
+            args,
+            input=input,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            env=dict(os.environ, **(env or {})),
+            # None lets the child inherit our environment as-is instead of copying os.environ.
+            env=None if env is None else {**os.environ, **env},
             timeout=timeout_s,
             check=False,
         )
     except FileNotFoundError as e:
-        raise PrinterPalError(f"Command not found: {argv[0]}") from e
+        raise PrinterPalError(f"Command not found: {args[0]}") from e
     except subprocess.TimeoutExpired as e:
-        raise PrinterPalError(f"Command timed out after {timeout_s:.1f}s: {' '.join(argv)}") from e
+        raise PrinterPalError(f"Command timed out after {timeout_s:.1f}s: {' '.join(args)}") from e
 
     dt = time.monotonic() - t0
     res = CmdResult(
-        argv=list(argv),
+        argv=args,
         returncode=int(cp.returncode),
-        stdout=cp.stdout or "",
-        stderr=cp.stderr or "",
+        stdout=(cp.stdout or b"").decode("utf-8", "replace"),
+        stderr=(cp.stderr or b"").decode("utf-8", "replace"),
         duration_s=float(dt),
     )
 
@@ -85,32 +100,62 @@ def run_cmd(
 
 
 def atomic_write_json(path: str, obj: Any, *, mode: int = 0o640) -> None:
-    """Atomically write JSON to disk."""
+    """Atomically and durably write JSON to disk."""
+    data = None
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS) + b"\n"
+        except TypeError:
+            # orjson.JSONEncodeError (a TypeError) covers inputs it refuses but the stdlib
+            # accepts, e.g. integers wider than 64 bits in user-supplied config keys.
+            data = None
+    if data is None:
+        data = (json.dumps(obj, indent=2, sort_keys=True) + "\n").encode("utf-8")
+
     d = os.path.dirname(path)
     os.makedirs(d, exist_ok=True)
     tmp = f"{path}.tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, sort_keys=True)
-        f.write("\n")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        # Without this a crash shortly after os.replace() can leave an empty file behind.
+        os.fsync(f.fileno())
     os.chmod(tmp, mode)
     os.replace(tmp, path)
 
+    # Persist the rename itself; best-effort, not every filesystem allows fsync on a directory.
+    try:
+        dir_fd = os.open(d or ".", os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize obj to compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
 
 def read_json(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+_BYTE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def human_bytes(n: int) -> str:
-    if n < 0:
+    if n <= 0:
         return "0 B"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    v = float(n)
-    for u in units:
-        if v < 1024.0 or u == units[-1]:
-            if u == "B":
-                return f"{int(v)} {u}"
-            return f"{v:.1f} {u}"
-        v /= 1024.0
-
-    return f"{v:.1f} TB"
+    # Each unit is 2**10 of the previous, so the bit length picks it directly.
+    idx = min((n.bit_length() - 1) // 10, len(_BYTE_UNITS) - 1)
+    if idx == 0:
+        return f"{n} B"
+    return f"{n / (1 << (idx * 10)):.1f} {_BYTE_UNITS[idx]}"
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-import json
+import errno
+import hashlib
 import logging
 import mimetypes
 import os
+import queue
+import re
+import shutil
+import tempfile
 import threading
 import time
 from functools import wraps
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from flask import (
     Flask,
@@ -17,34 +22,47 @@ from flask import (
     redirect,
     render_template,
     request,
+    send_file,
     send_from_directory,
     stream_with_context,
     url_for,
 )
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
+try:
+    from flask_limiter import Limiter  # type: ignore
+    from flask_limiter.util import get_remote_address  # type: ignore
+except Exception:
+    # Optional: without Flask-Limiter the endpoints are simply not rate limited.
+    Limiter = None
+
+from . import rendercache
 from .airprint import ensure_airprint_via_root_helper
 from .config import ConfigStore
-from .imageproc import SUPPORTED_IMAGE_EXTS, prepare_print_file, render_preview_png
+from .imageproc import SUPPORTED_IMAGE_EXTS, prepare_print_bytes, render_preview_png
 from .printer import (
     cups_available,
-    get_default_printer,
-    get_default_printer_display,
     job_stats,
-    list_printers,
-    printer_detail,
+    print_bytes,
     print_file,
-    queue_jobs,
-    scheduler_status,
+    printer_detail,
+    snapshot,
 )
-from .util import PrinterPalError, human_bytes, run_cmd
+from .util import PrinterPalError, dumps_json, human_bytes, run_cmd
 
 
 UPLOAD_DIR = os.environ.get("PRINTERPAL_UPLOAD_DIR", "/var/lib/printerpal/uploads")
 CACHE_DIR = os.environ.get("PRINTERPAL_CACHE_DIR", "/var/lib/printerpal/cache")
 ROOT_HELPER = os.environ.get("PRINTERPAL_ROOT_HELPER", "/usr/local/sbin/printerpal-root")
 
-ALLOWED_EXTS = {".pdf", *SUPPORTED_IMAGE_EXTS}
+ALLOWED_EXTS = frozenset({".pdf", *SUPPORTED_IMAGE_EXTS})
+
+# Static assets: names carrying a content hash (app.3f9a1c2e.js) never change, so cache them for
+# a year; everything else gets a short max-age and revalidates via ETag.
+STATIC_MAX_AGE_S = 300
+STATIC_IMMUTABLE_MAX_AGE_S = 365 * 24 * 3600
+_HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
 
 
 def _ensure_dirs() -> None:
@@ -52,37 +70,196 @@ def _ensure_dirs() -> None:
     os.makedirs(CACHE_DIR, exist_ok=True)
 
 
-def _list_uploads(limit: int = 25) -> List[Dict[str, Any]]:
+def _scan_uploads(limit: int = 25) -> Tuple[List[Dict[str, Any]], str, int]:
+    """Return (newest files, validator tag, newest mtime) for the upload directory."""
     files: List[Dict[str, Any]] = []
+    total = 0
+    max_mtime_ns = 0
     try:
-        names = os.listdir(UPLOAD_DIR)
+        it = os.scandir(UPLOAD_DIR)
     except FileNotFoundError:
-        return files
+        return files, "0-0-0", 0
 
-    for name in names:
-        path = os.path.join(UPLOAD_DIR, name)
-        if not os.path.isfile(path):
-            continue
-        try:
-            st = os.stat(path)
-        except OSError:
-            continue
-        files.append(
-            {
-                "name": name,
-                "size": int(st.st_size),
-                "size_h": human_bytes(int(st.st_size)),
-                "mtime": int(st.st_mtime),
-            }
-        )
+    with it:
+        for entry in it:
+            if entry.name.startswith("."):
+                # In-progress uploads; secure_filename never yields a leading dot.
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            total += int(st.st_size)
+            max_mtime_ns = max(max_mtime_ns, int(st.st_mtime_ns))
+            files.append(
+                {
+                    "name": entry.name,
+                    "size": int(st.st_size),
+                    "size_h": human_bytes(int(st.st_size)),
+                    "mtime": int(st.st_mtime),
+                }
+            )
 
+    tag = f"{len(files)}-{max_mtime_ns}-{total}"
     files.sort(key=lambda x: x["mtime"], reverse=True)
-    return files[: max(1, min(limit, 200))]
+    return files[: max(1, min(limit, 200))], tag, max_mtime_ns // 1_000_000_000
+
+
+def _list_uploads(limit: int = 25) -> List[Dict[str, Any]]:
+    return _scan_uploads(limit)[0]
+
+
+def _publish_upload(tmp: str, filename: str) -> str:
+    """Hard-link tmp into UPLOAD_DIR as filename without clobbering; returns the name used."""
+    base, ext = os.path.splitext(filename)
+    stamp = int(time.time())
+    # Avoid clobber: add timestamp suffix (and a counter, if need be) when the name is taken.
+    outname = filename
+    i = 1
+    while True:
+        try:
+            _claim_upload_name(tmp, os.path.join(UPLOAD_DIR, outname))
+            return outname
+        except FileExistsError:
+            outname = f"{base}_{stamp}{ext}" if i == 1 else f"{base}_{stamp}_{i}{ext}"
+            i += 1
+
+
+_NO_HARDLINK_ERRNOS = frozenset({errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP})
+
+
+def _claim_upload_name(tmp: str, dst: str) -> None:
+    """Move tmp to dst, raising FileExistsError instead of replacing an existing dst."""
+    try:
+        # link() fails if the target exists, so claiming the name is atomic.
+        os.link(tmp, dst)
+        return
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in _NO_HARDLINK_ERRNOS:
+            raise
+    # No hard links on this filesystem (e.g. vfat): claim the name with an exclusive create,
+    # then move the finished upload over the empty placeholder.
+    os.close(os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o640))
+    os.replace(tmp, dst)
 
 
 def _allowed_filename(filename: str) -> bool:
-    ext = os.path.splitext(filename)[1].lower()
-    return ext in ALLOWED_EXTS
+    # i > 0 keeps splitext's rule that a leading-dot name like ".pdf" has no extension.
+    i = filename.rfind(".")
+    return i > 0 and filename[i:].lower() in ALLOWED_EXTS
+
+
+def _ttl_cache(ttl: float) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+    """Memoize a zero-argument function for `ttl` seconds.
+
+    Callers arriving while the value is being computed wait for it rather than
+    recomputing, so N concurrent pollers cost one computation per `ttl`.
+    """
+
+    def decorator(fn: Callable[[], Any]) -> Callable[[], Any]:
+        lock = threading.Lock()
+        state: Dict[str, Any] = {"expires": 0.0, "value": None}
+
+        @wraps(fn)
+        def wrapper() -> Any:
+            with lock:
+                if time.monotonic() < state["expires"]:
+                    return state["value"]
+                value = fn()
+                state["value"] = value
+                state["expires"] = time.monotonic() + ttl
+                return value
+
+        def invalidate() -> None:
+            with lock:
+                state["expires"] = 0.0
+
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+def _json_response(obj: Any) -> Response:
+    # Used on the polled endpoints instead of jsonify so orjson does the encoding when available.
+    return Response(dumps_json(obj), mimetype="application/json")
+
+
+class _SSEHub:
+    """Build the /events payload once per tick and fan it out to every connected client.
+
+    `build` returns (payload, digest); a client is only sent a payload whose digest differs
+    from the last one it received, so an idle dashboard costs nothing but keepalives.
+    """
+
+    def __init__(self, build: Callable[[], Tuple[bytes, bytes]], *, interval_s: float = 2.0) -> None:
+        self._build = build
+        self._interval_s = interval_s
+        self._lock = threading.Lock()
+        # queue -> digest of the last payload delivered to it
+        self._subscribers: Dict[queue.Queue, Optional[bytes]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._last: Optional[Tuple[bytes, bytes]] = None
+
+    def register(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers[q] = None
+            if self._last is not None:
+                # Give a new client the latest state without waiting for the next tick.
+                q.put_nowait(self._last[0])
+                self._subscribers[q] = self._last[1]
+            if self._thread is None:
+                # Started lazily so it never exists in a pre-fork gunicorn master.
+                self._thread = threading.Thread(target=self._run, name="printerpal-sse", daemon=True)
+                self._thread.start()
+
+    def unregister(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._last = None
+                    return
+                subscribers = list(self._subscribers.items())
+
+            payload, digest = self._build()
+            with self._lock:
+                self._last = (payload, digest)
+            for q, seen in subscribers:
+                if seen == digest:
+                    continue
+                try:
+                    q.put_nowait(payload)
+                except queue.Full:
+                    # Slow client; drop this tick rather than buffer without bound.
+                    continue
+                with self._lock:
+                    if q in self._subscribers:
+                        self._subscribers[q] = digest
+
+            time.sleep(self._interval_s)
+
+
+def _fresh_gzip(folder: str, filename: str) -> bool:
+    """True if `<filename>.gz` exists in folder and is not older than `filename` itself."""
+    src = safe_join(folder, filename)
+    if src is None:
+        return False
+    try:
+        gz_st = os.stat(src + ".gz")
+        src_st = os.stat(src)
+    except OSError:
+        return False
+    # A stale .gz (asset updated, gzip not re-run) must not shadow the current file.
+    return gz_st.st_mtime_ns >= src_st.st_mtime_ns
 
 
 def _require_token(app: Flask):
@@ -127,11 +304,16 @@ def create_app() -> Flask:
     app.config["PP_AIRPRINT_LAST_ENSURE"] = 0.0
     app.config["PP_AIRPRINT_LAST_SIG"] = ""
     app.config["PP_AIRPRINT_LOCK"] = threading.Lock()
+    app.config["PP_INDEX_HTML"] = None
     app.secret_key = cfg["app"]["secret_key"]
 
     # Flask upload limit.
     app.config["MAX_CONTENT_LENGTH"] = int(cfg["app"]["max_upload_mb"]) * 1024 * 1024
 
+    # Behind a proxy that honours X-Sendfile (Apache mod_xsendfile, lighttpd), let it serve file bodies.
+    if os.environ.get("PRINTERPAL_USE_X_SENDFILE", "").strip().lower() in {"1", "true", "yes"}:
+        app.config["USE_X_SENDFILE"] = True
+
     # Best-effort AirPrint on startup.
     if cfg.get("airprint", {}).get("auto_enable"):
         try:
@@ -142,12 +324,51 @@ def create_app() -> Flask:
 
     require_token = _require_token(app)
 
+    # Per-process, in-memory buckets: each gunicorn worker enforces its own limits.
+    limiter = None
+    if Limiter is None:
+        log.warning("Flask-Limiter is not installed; upload/print/preview/config endpoints are not rate limited")
+    else:
+        try:
+            # Keyword arguments: 1.x/2.x take `app` as the first positional parameter, 3.x `key_func`.
+            limiter = Limiter(key_func=get_remote_address, app=app, storage_uri="memory://")
+        except Exception as e:
+            # An incompatible Flask-Limiter must not keep the service from starting.
+            log.warning("Flask-Limiter could not be initialised (%s); endpoints are not rate limited", e)
+
+    def rate_limit(spec: str):
+        if limiter is None:
+            return lambda fn: fn
+        return limiter.limit(spec)
+
+    # Probed by /healthz and every status build; CUPS coming and going is not sub-second news.
+    cups_available_cached = _ttl_cache(5.0)(cups_available)
+
+    def static_files(filename: str):
+        # Replaces Flask's static view; serves a precompressed `<file>.gz` when the client takes gzip.
+        folder = app.static_folder
+        hashed = _HASHED_ASSET_RE.search(filename) is not None
+        max_age = STATIC_IMMUTABLE_MAX_AGE_S if hashed else STATIC_MAX_AGE_S
+
+        if request.accept_encodings["gzip"] and _fresh_gzip(folder, filename):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            resp = send_from_directory(folder, filename + ".gz", mimetype=mimetype, max_age=max_age)
+            resp.headers["Content-Encoding"] = "gzip"
+        else:
+            resp = send_from_directory(folder, filename, max_age=max_age)
+
+        resp.vary.add("Accept-Encoding")
+        if hashed:
+            resp.cache_control.immutable = True
+        return resp
+
+    app.view_functions["static"] = static_files
+
     @app.route("/healthz")
     def healthz():
-        return jsonify({"ok": True, "cups": cups_available()})
+        return jsonify({"ok": True, "cups": cups_available_cached()})
 
-    @app.route("/")
-    def index():
+    def _render_index() -> str:
         cfg = app.config["PP_CFG"]
         return render_template(
             "index.html",
@@ -155,12 +376,24 @@ def create_app() -> Flask:
             default_mode=cfg.get("printing", {}).get("default_mode", "grayscale"),
         )
 
+    @app.route("/")
+    def index():
+        # The page depends only on config, so render it once and again after each config save.
+        # Rendered lazily because url_for() needs a request context without SERVER_NAME.
+        html = app.config.get("PP_INDEX_HTML")
+        if html is None:
+            html = _render_index()
+            app.config["PP_INDEX_HTML"] = html
+        return Response(html, mimetype="text/html")
+
     @app.route("/uploads/<path:filename>")
     def downloads(filename: str):
-        # Only serve from upload directory.
-        return send_from_directory(UPLOAD_DIR, filename, as_attachment=True)
+        # Only serve from upload directory. Passing a path (not a stream) lets Werkzeug hand the
+        # open file to the server's wsgi.file_wrapper, which gunicorn serves with sendfile(2).
+        return send_from_directory(UPLOAD_DIR, filename, as_attachment=True, conditional=True)
 
     @app.route("/upload", methods=["POST"])
+    @rate_limit("10/minute")
     def upload():
         if "file" not in request.files:
             abort(400, description="No file part")
@@ -174,68 +407,106 @@ def create_app() -> Flask:
         if not _allowed_filename(filename):
             abort(415, description="Unsupported file type. Use PDF or common image formats.")
 
-        # Avoid clobber: add timestamp suffix if exists.
-        base, ext = os.path.splitext(filename)
-        outname = filename
-        outpath = os.path.join(UPLOAD_DIR, outname)
-        if os.path.exists(outpath):
-            outname = f"{base}_{int(time.time())}{ext}"
-            outpath = os.path.join(UPLOAD_DIR, outname)
-
-        file.save(outpath)
+        # Stream to a hidden temp file in the upload dir, then publish it under its final name.
+        fd, tmp = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(file.stream, f, length=1 << 20)
+            os.chmod(tmp, 0o640)
+            _publish_upload(tmp, filename)
+        finally:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
         return redirect(url_for("index"))
 
     @app.route("/api/files")
     def api_files():
-        return jsonify({"files": _list_uploads(limit=50)})
-
-    @app.route("/api/status")
-    def api_status():
+        files, tag, mtime = _scan_uploads(limit=50)
+        # Pollers get a bodiless 304 until something in the upload dir changes.
+        if request.if_none_match.contains_weak(tag):
+            resp = Response(status=304)
+            resp.set_etag(tag, weak=True)
+            return resp
+        resp = _json_response({"files": files})
+        resp.set_etag(tag, weak=True)
+        # Store, but always revalidate; that is what makes the 304 above reachable.
+        resp.cache_control.no_cache = True
+        if mtime:
+            resp.last_modified = mtime
+        return resp
+
+    @_ttl_cache(2.0)
+    def _build_status_payload() -> Dict[str, Any]:
+        # Shared by every /api/status poll and SSE tick; treat the result as read-only.
         cfg = app.config["PP_CFG"]
-        printers = [p.__dict__ for p in list_printers()] if cups_available() else []
-        default = get_default_printer()
-        default_display = get_default_printer_display()
-        default_label = f"{default_display} (default)" if default_display else ""
-        stats = job_stats() if cups_available() else {}
-        jobs = queue_jobs() if cups_available() else []
-
-        auto_airprint = bool(cfg.get("airprint", {}).get("auto_enable"))
-        airprint_state: Dict[str, Any] = {"enabled": auto_airprint}
+        cups_ok = cups_available_cached()
+        snap = snapshot()
+        printers = [p.__dict__ for p in snap.printers] if cups_ok else []
+        default_display = snap.default_display
+        jobs = snap.jobs if cups_ok else []
+        return {
+            "cups_available": cups_ok,
+            "scheduler": snap.scheduler,
+            "default_printer": snap.default,
+            "default_printer_display": default_display,
+            "default_printer_label": f"{default_display} (default)" if default_display else "",
+            "printers": printers,
+            "jobs": jobs,
+            "stats": job_stats(active=jobs) if cups_ok else {},
+            "airprint": {"enabled": bool(cfg.get("airprint", {}).get("auto_enable"))},
+        }
 
+    def _maybe_ensure_airprint(status: Dict[str, Any]) -> None:
         # Best-effort, rate-limited auto AirPrint ensure.
-        if auto_airprint and cups_available():
-            try:
-                sig = ",".join(sorted([p.get("name", "") for p in printers if p.get("name")]))
-                now = time.monotonic()
-                last_t = float(app.config.get("PP_AIRPRINT_LAST_ENSURE") or 0.0)
-                last_sig = str(app.config.get("PP_AIRPRINT_LAST_SIG") or "")
-                # Re-run if printer set changed or every 10 minutes.
-                if sig != last_sig or (now - last_t) > 600.0:
-                    lock = app.config["PP_AIRPRINT_LOCK"]
-                    if lock.acquire(blocking=False):
-                        try:
-                            ensure_airprint_via_root_helper(timeout_s=45.0)
-                            app.config["PP_AIRPRINT_LAST_ENSURE"] = now
-                            app.config["PP_AIRPRINT_LAST_SIG"] = sig
-                        finally:
-                            lock.release()
-            except Exception:
-                # Non-fatal: AirPrint may not be available in all deployments.
-                pass
+        if not status["airprint"]["enabled"] or not status["cups_available"]:
+            return
+        try:
+            printers = status["printers"]
+            sig = ",".join(sorted([p.get("name", "") for p in printers if p.get("name")]))
+            now = time.monotonic()
+            last_t = float(app.config.get("PP_AIRPRINT_LAST_ENSURE") or 0.0)
+            last_sig = str(app.config.get("PP_AIRPRINT_LAST_SIG") or "")
+            # Re-run if printer set changed or every 10 minutes.
+            if sig != last_sig or (now - last_t) > 600.0:
+                lock = app.config["PP_AIRPRINT_LOCK"]
+                if lock.acquire(blocking=False):
+                    # The helper can take up to 45s; never make a status poll wait on it.
+                    # The worker owns the lock from here and releases it when done.
+                    try:
+                        threading.Thread(
+                            target=_do_ensure_airprint,
+                            args=(lock, now, sig),
+                            name="printerpal-airprint",
+                            daemon=True,
+                        ).start()
+                    except Exception:
+                        lock.release()
+                        raise
+        except Exception:
+            # Non-fatal: AirPrint may not be available in all deployments.
+            pass
+
+    def _do_ensure_airprint(lock: threading.Lock, now: float, sig: str) -> None:
+        try:
+            ensure_airprint_via_root_helper(timeout_s=45.0)
+            app.config["PP_AIRPRINT_LAST_ENSURE"] = now
+            app.config["PP_AIRPRINT_LAST_SIG"] = sig
+        except Exception as e:
+            # Retried on the next due poll; keep quiet to avoid a log line every tick.
+            log.debug("AirPrint ensure failed: %s", e)
+        finally:
+            lock.release()
 
-        return jsonify(
-            {
-                "cups_available": cups_available(),
-                "scheduler": scheduler_status(),
-                "default_printer": default,
-                "default_printer_display": default_display,
-                "default_printer_label": default_label,
-                "printers": printers,
-                "jobs": jobs,
-                "stats": stats,
-                "airprint": airprint_state,
-            }
-        )
+    def _status() -> Dict[str, Any]:
+        status = _build_status_payload()
+        _maybe_ensure_airprint(status)
+        return status
+
+    @app.route("/api/status")
+    def api_status():
+        return _json_response(_status())
 
     @app.route("/api/printer/<name>")
     def api_printer_detail(name: str):
@@ -246,6 +517,7 @@ def create_app() -> Flask:
         return jsonify({"config": app.config["PP_CFG"]})
 
     @app.route("/api/config", methods=["POST"])
+    @rate_limit("10/minute")
     @require_token
     def api_config_set():
         store: ConfigStore = app.config["PP_STORE"]
@@ -256,10 +528,12 @@ def create_app() -> Flask:
         if not isinstance(cfg_new, dict):
             abort(400, description="config must be an object")
 
-        store.save(cfg_new)
-        cfg = store.load()
+        cfg = store.save(cfg_new)
         app.config["PP_CFG"] = cfg
+        # The status payload reflects config (e.g. airprint.auto_enable); rebuild it on next poll.
+        _build_status_payload.invalidate()
         app.config["MAX_CONTENT_LENGTH"] = int(cfg["app"]["max_upload_mb"]) * 1024 * 1024
+        app.config["PP_INDEX_HTML"] = _render_index()
 
         if cfg.get("airprint", {}).get("auto_enable"):
             try:
@@ -270,6 +544,7 @@ def create_app() -> Flask:
         return jsonify({"ok": True, "config": cfg})
 
     @app.route("/api/preview/<path:filename>")
+    @rate_limit("60/minute")
     def api_preview(filename: str):
         cfg = app.config["PP_CFG"]
         mode = request.args.get("mode", cfg.get("printing", {}).get("default_mode", "grayscale"))
@@ -277,24 +552,42 @@ def create_app() -> Flask:
         width = int(request.args.get("w", "720"))
 
         path = os.path.join(UPLOAD_DIR, filename)
-        if not os.path.exists(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
             abort(404)
 
+        preview_dpi = int(cfg["printing"]["preview_dpi"])
+        threshold = int(cfg["printing"]["bw_threshold"])
+
+        # Previews are deterministic until the source changes, so key on its mtime/size.
+        token = f"{filename}|{st.st_mtime_ns}|{st.st_size}|{mode}|{page}|{width}|{preview_dpi}|{threshold}"
+        key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+        cached = rendercache.lookup_file(key)
+        if cached:
+            return send_file(cached, mimetype="image/png", etag=key, conditional=True)
+
         try:
             png = render_preview_png(
                 path,
                 mode=mode,
                 page=page,
                 width=width,
-                preview_dpi=int(cfg["printing"]["preview_dpi"]),
-                threshold=int(cfg["printing"]["bw_threshold"]),
+                preview_dpi=preview_dpi,
+                threshold=threshold,
+                st=st,
             )
         except PrinterPalError as e:
             abort(400, description=str(e))
 
-        return Response(png, mimetype="image/png")
+        rendercache.store_file(key, png)
+        resp = Response(png, mimetype="image/png")
+        resp.set_etag(key)
+        return resp.make_conditional(request)
 
     @app.route("/api/print", methods=["POST"])
+    @rate_limit("30/minute")
     @require_token
     def api_print():
         cfg = app.config["PP_CFG"]
@@ -311,37 +604,38 @@ def create_app() -> Flask:
         copies = int(payload.get("copies") or cfg["printing"].get("default_copies", 1))
 
         path = os.path.join(UPLOAD_DIR, filename)
-        if not os.path.exists(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
             abort(404, description="File not found")
 
-        tmp_out: str | None = None
         try:
-            prepared_path, meta = prepare_print_file(
+            pdf_bytes, _meta = prepare_print_bytes(
                 path,
                 mode=mode,
                 print_dpi=int(cfg["printing"]["print_dpi"]),
                 max_pdf_pages=int(cfg["printing"]["max_pdf_pages_process"]),
                 threshold=int(cfg["printing"]["bw_threshold"]),
+                st=st,
             )
-            if meta.get("prepared"):
-                tmp_out = prepared_path
-
-            res = print_file(
-                prepared_path,
-                printer=printer,
-                copies=copies,
-                title=f"PrinterPal: {filename}",
-                options=[],
-                timeout_s=60.0,
-            )
+            lp_args: Dict[str, Any] = {
+                "printer": printer,
+                "copies": copies,
+                "title": f"PrinterPal: {filename}",
+                "options": [],
+                "timeout_s": 60.0,
+            }
+            # Prepared output is piped straight to lp; no temp file round-trip.
+            try:
+                if pdf_bytes is None:
+                    res = print_file(path, **lp_args)
+                else:
+                    res = print_bytes(pdf_bytes, **lp_args)
+            finally:
+                # The queue changed; don't keep serving the memoized pre-submit status.
+                _build_status_payload.invalidate()
         except PrinterPalError as e:
             return jsonify({"ok": False, "error": str(e)}), 500
-        finally:
-            if tmp_out and os.path.exists(tmp_out):
-                try:
-                    os.remove(tmp_out)
-                except OSError:
-                    pass
 
         return jsonify({"ok": True, "lp_stdout": res.stdout.strip()})
 
@@ -364,23 +658,41 @@ def create_app() -> Flask:
         except Exception as e:
             return jsonify({"ok": False, "error": str(e)}), 500
 
+    def _event_digest(body: Dict[str, Any]) -> bytes:
+        # Hash without "ts" so an unchanged state is recognised from tick to tick.
+        return hashlib.blake2b(dumps_json(body), digest_size=8).digest()
+
+    def _build_event() -> Tuple[bytes, bytes]:
+        try:
+            body = {
+                "files": _list_uploads(limit=25),
+                "status": _status(),
+            }
+            data = dumps_json({"ts": int(time.time()), **body})
+            return b"event: status\ndata: " + data + b"\n\n", _event_digest(body)
+        except Exception as e:
+            # Keep connection alive with an error event.
+            body = {"error": str(e)}
+            data = dumps_json({"ts": int(time.time()), **body})
+            return b"event: error\ndata: " + data + b"\n\n", _event_digest(body)
+
+    sse_hub = _SSEHub(_build_event, interval_s=2.0)
+
     @app.route("/events")
+    # Generous: a 429 ends an EventSource for good, and extra subscribers are nearly free (_SSEHub).
+    @rate_limit("30/minute")
     def events():
         def gen():
-            while True:
-                try:
-                    status = {
-                        "ts": int(time.time()),
-                        "files": _list_uploads(limit=25),
-                        "status": json.loads(api_status().get_data(as_text=True)),
-                    }
-                    yield f"event: status\ndata: {json.dumps(status)}\n\n"
-                except Exception as e:
-                    # Keep connection alive with an error event.
-                    payload = {"ts": int(time.time()), "error": str(e)}
-                    yield f"event: error\ndata: {json.dumps(payload)}\n\n"
-
-                time.sleep(2.0)
+            q: queue.Queue = queue.Queue(maxsize=4)
+            sse_hub.register(q)
+            try:
+                while True:
+                    try:
+                        yield q.get(timeout=15.0)
+                    except queue.Empty:
+                        yield b": keepalive\n\n"
+            finally:
+                sse_hub.unregister(q)
 
         headers = {
             "Content-Type": "text/event-stream",